@@ -5,6 +5,7 @@ Main application file with routes and configuration
 
 import os
 import json
+import hashlib
 from flask import Flask, request, render_template, jsonify, send_from_directory
 from werkzeug.utils import secure_filename
 
@@ -21,15 +22,90 @@ app = Flask(__name__)
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'pdf'}
+CACHE_FOLDER = 'cache'
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # 256MB cap on cached results
+ALLOWED_EXTENSION = '.pdf'
 MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max file size
 
-# Create upload folder if it doesn't exist
+# Create upload and cache folders if they don't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(CACHE_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
 
+def cache_lookup(key):
+    """
+    Look up cached ESG results for a content hash
+
+    Args:
+        key (str): SHA-256 hex digest of the PDF bytes
+
+    Returns:
+        list or None: Cached results, or None on a cache miss
+    """
+    cache_path = os.path.join(CACHE_FOLDER, f"{key}.json")
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path) as f:
+            results = json.load(f)
+        # Touch the file so LRU eviction sees it as recently used
+        os.utime(cache_path)
+        return results
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ Failed to read cache entry {key}: {e}")
+        return None
+
+
+def cache_store(key, results):
+    """
+    Store ESG results under a content hash and evict old entries
+
+    Args:
+        key (str): SHA-256 hex digest of the PDF bytes
+        results (list): ESG analysis results to cache
+    """
+    cache_path = os.path.join(CACHE_FOLDER, f"{key}.json")
+    try:
+        with open(cache_path, 'w') as f:
+            json.dump(results, f)
+    except OSError as e:
+        print(f"⚠️ Failed to write cache entry {key}: {e}")
+        return
+    evict_cache()
+
+
+def evict_cache():
+    """
+    Evict least-recently-used cache entries until under the size cap
+    """
+    entries = []
+    for name in os.listdir(CACHE_FOLDER):
+        path = os.path.join(CACHE_FOLDER, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if total <= CACHE_MAX_BYTES:
+        return
+
+    # Oldest first
+    entries.sort()
+    for _, size, path in entries:
+        if total <= CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            print(f"🧹 Evicted cache entry {os.path.basename(path)}")
+        except OSError:
+            continue
+
+
 def allowed_file(filename):
     """
     Check if the uploaded file is allowed
@@ -40,8 +116,8 @@ def allowed_file(filename):
     Returns:
         bool: True if file extension is allowed
     """
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    # Single extension, so a splitext comparison beats building a list
+    return os.path.splitext(filename)[1].lower() == ALLOWED_EXTENSION
 
 
 @app.route("/")
@@ -78,12 +154,24 @@ def upload_pdf():
         return jsonify({"error": "Only PDF files are allowed"}), 400
 
     try:
-        # Save uploaded file
+        # Stream the upload to disk in 1MB chunks, hashing as we go: one
+        # sequential pass instead of read-all-then-save, so a max-sized PDF
+        # never sits fully in memory and the cache key comes for free
         filename = secure_filename(pdf_file.filename)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        pdf_file.save(filepath)
+        hasher = hashlib.sha256()
+        with open(filepath, 'wb') as out:
+            for chunk in iter(lambda: pdf_file.stream.read(1 << 20), b''):
+                hasher.update(chunk)
+                out.write(chunk)
+        key = hasher.hexdigest()
         print(f"📄 Saved uploaded PDF to {filepath}")
 
+        cached = cache_lookup(key)
+        if cached is not None:
+            print(f"⚡ Cache hit for {key[:12]}... returning stored results")
+            return jsonify(cached)
+
         # Process PDF for text extraction
         extracted_data = extract_esg_pdf_sentences(filepath)
         
@@ -96,6 +184,8 @@ def upload_pdf():
         esg_results = semantic_search.run_semantic_search(extracted_data)
         print(f"🎯 Found {len(esg_results)} ESG-related sentences.")
 
+        cache_store(key, esg_results)
+
         return jsonify(esg_results)
         
     except Exception as e:
@@ -228,13 +318,15 @@ def sharp_test():
     return render_template("sharp-test.html")
 
 if __name__ == "__main__":
-    print("🚀 Starting ESG PDF Semantic Search Application...")
+    print("🚀 Starting ESG PDF Semantic Search Application (dev server)...")
     print(f"📁 Upload folder: {UPLOAD_FOLDER}")
     print(f"📊 Max file size: {MAX_CONTENT_LENGTH / (1024*1024):.0f}MB")
-    
+    print("💡 For production use gunicorn, see wsgi.py")
+
+    # Debug (and the reloader, which double-loads the model) is opt-in only
     app.run(
-        debug=True, 
-        host="0.0.0.0", 
+        debug=os.environ.get("FLASK_DEBUG") == "1",
+        host="0.0.0.0",
         port=8080,
         threaded=True
     )
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+ONNX Export + INT8 Quantization for the MiniLM sentence encoder
+Run once to produce a quantized model that semantic_search loads for
+fast CPU inference: python export_onnx.py
+"""
+
+import os
+
+from optimum.onnxruntime import ORTModelForFeatureExtraction
+from onnxruntime.quantization import quantize_dynamic, QuantType
+from transformers import AutoTokenizer
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+OUTPUT_DIR = os.path.join("models", "minilm-onnx")
+
+
+def export_and_quantize():
+    """
+    Export MiniLM to ONNX and apply dynamic INT8 quantization on MatMul ops.
+
+    Produces model.onnx (FP32) and model.int8.onnx (INT8 weights) plus the
+    tokenizer files inside OUTPUT_DIR.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    print(f"📦 Exporting {MODEL_NAME} to ONNX...")
+    model = ORTModelForFeatureExtraction.from_pretrained(MODEL_NAME, export=True)
+    model.save_pretrained(OUTPUT_DIR)
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    tokenizer.save_pretrained(OUTPUT_DIR)
+
+    fp32_path = os.path.join(OUTPUT_DIR, "model.onnx")
+    int8_path = os.path.join(OUTPUT_DIR, "model.int8.onnx")
+
+    print("⚙️ Quantizing MatMul weights to INT8...")
+    quantize_dynamic(
+        model_input=fp32_path,
+        model_output=int8_path,
+        op_types_to_quantize=["MatMul"],
+        weight_type=QuantType.QInt8,
+    )
+
+    print(f"✅ Quantized model written to {int8_path}")
+
+
+if __name__ == "__main__":
+    export_and_quantize()
@@ -4,18 +4,65 @@ Extracts sentences and headings with RAW PyMuPDF bounding boxes.
 Includes spatial proximity filtering to prevent coordinate mismatches.
 """
 
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import groupby
+
 import fitz  # PyMuPDF
+import numpy as np
 import pytesseract
-from PIL import Image
-import nltk
-from nltk.tokenize import sent_tokenize
 
-# Ensure NLTK's sentence tokenizer data is present
-nltk.download("punkt", quiet=True)
+# Hot-loop diagnostics go through logging so the per-region messages cost
+# nothing unless explicitly enabled (raise to DEBUG to get the old output)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+# PyMuPDF line bboxes span ascender-to-descender, typically ~1.1-1.3x the
+# font's point size; divide heights by this to approximate point size
+LINE_HEIGHT_PER_POINT = 1.25
+
+# Prefer the Rust nupunkt tokenizer (much faster, better on financial
+# abbreviations like "Inc.", "U.S.", "Ltd."); fall back to NLTK Punkt.
+try:
+    import nupunkt_rs
+    _sentence_tokenizer = None
+except ImportError:
+    nupunkt_rs = None
+    import nltk
+
+    # Ensure NLTK's sentence tokenizer data is present
+    nltk.download("punkt", quiet=True)
+
+    # Load the Punkt tokenizer once; span_tokenize gives us (start, end)
+    # offsets directly so we never have to rescan the buffer per sentence.
+    _sentence_tokenizer = nltk.data.load("tokenizers/punkt/english.pickle")
+
+
+def sentence_spans(text):
+    """
+    Yield (start, end) character spans of sentences in text.
+
+    Uses nupunkt_rs when installed, otherwise NLTK Punkt. The nupunkt path
+    recovers offsets with a forward-moving find, which stays linear overall.
+    """
+    if nupunkt_rs is not None:
+        pos = 0
+        for sent in nupunkt_rs.sent_tokenize(text):
+            start = text.find(sent, pos)
+            if start == -1:
+                continue
+            end = start + len(sent)
+            yield start, end
+            pos = end
+    else:
+        yield from _sentence_tokenizer.span_tokenize(text)
 
 def is_heading(text, size):
     """Detect headings by format."""
-    return text.isupper() and size > 16
+    # Cheap size compare first: body text is almost always <= 16pt, so the
+    # per-character isupper() scan is skipped on nearly every line
+    return size > 16 and text.isupper()
 
 def calculate_vertical_distance(bbox1, bbox2):
     """Calculate vertical distance between two bboxes"""
@@ -27,116 +74,119 @@ def filter_spatially_close_bboxes(bboxes, max_vertical_distance=50):
     """
     Filter bboxes to keep only those that are spatially close to each other.
     This prevents matching text from different parts of the page.
-    
+
     Args:
-        bboxes: List of bounding boxes
+        bboxes: (N, 4) NumPy array of bounding boxes
         max_vertical_distance: Maximum vertical distance in points (default: 50)
-    
+
     Returns:
-        List of filtered bboxes
+        (M, 4) NumPy array of filtered bboxes
     """
-    if not bboxes:
-        return []
-    
-    if len(bboxes) == 1:
+    if len(bboxes) <= 1:
         return bboxes
-    
-    # Calculate median Y position
-    y_positions = [(bbox[1] + bbox[3]) / 2 for bbox in bboxes]
-    median_y = sorted(y_positions)[len(y_positions) // 2]
-    
+
+    # Vectorized Y-centers and median instead of a per-bbox Python loop
+    centers_y = (bboxes[:, 1] + bboxes[:, 3]) * 0.5
+    median_y = np.median(centers_y)
+
     # Keep only bboxes close to the median
-    filtered = [bbox for bbox in bboxes 
-                if abs((bbox[1] + bbox[3]) / 2 - median_y) < max_vertical_distance]
-    
-    return filtered if filtered else bboxes
+    keep = np.abs(centers_y - median_y) < max_vertical_distance
 
-def extract_pdf_regions(pdf_path):
-    """Extract all headings and sentences with RAW PyMuPDF bounding boxes."""
-    print(f"Loading PDF: {pdf_path}")
-    doc = fitz.open(pdf_path)
+    return bboxes[keep] if keep.any() else bboxes
+
+def _process_page(page, page_idx):
+    """Extract heading and sentence regions from a single page."""
+    page_w = page.rect.width
+    page_h = page.rect.height
+    # "words" returns flat C-level tuples (x0, y0, x1, y1, word, block, line,
+    # word_no) — far less allocation than the nested dict from get_text("dict")
+    words = page.get_text("words")
+    bulk = ""
+    indices = []
     results = []
-    print(f"Total pages found: {len(doc)}")
-
-    for page_idx, page in enumerate(doc):
-        page_w = page.rect.width
-        page_h = page.rect.height
-        blocks = page.get_text("dict").get("blocks", [])
-        bulk = ""
-        indices = []
-        print(f"Processing Page {page_idx+1} (size: {page_w:.1f} x {page_h:.1f})...")
-
-        for block in blocks:
-            if "lines" not in block:
-                continue
-            
-            # Get block bbox for additional filtering
-            block_bbox = block.get("bbox", None)
-            
-            for line in block["lines"]:
-                sizes = [span["size"] for span in line["spans"] if span["text"].strip()]
-                if not sizes:
-                    continue
-                fsize = max(sizes)
-                line_txt = " ".join(span["text"].strip() for span in line["spans"] if span["text"].strip())
-                if not line_txt:
-                    continue
-
-                if is_heading(line_txt, fsize):
-                    bbox = line["bbox"]
-                    print(f"  Found heading: '{line_txt[:30]}' at RAW {bbox}")
-                    results.append({
-                        "page": page_idx + 1,
-                        "type": "heading",
-                        "text": line_txt.strip(),
-                        "coords": {
-                            "x0": bbox[0],
-                            "y0": bbox[1],
-                            "x1": bbox[2],
-                            "y1": bbox[3]
-                        },
-                        "page_dimensions": {"width": page_w, "height": page_h},
-                        "font_size": fsize
-                    })
-                else:
-                    start_pos = len(bulk)
-                    bulk += line_txt + " "
-                    end_pos = len(bulk)
-                    # Store bbox with block context
-                    indices.append((start_pos, end_pos, line["bbox"], block_bbox))
-
-        print(f"  Assembled {len(indices)} spans on page {page_idx+1}.")
+    logger.debug("Processing Page %d (size: %.1f x %.1f)...", page_idx + 1, page_w, page_h)
+
+    # Words arrive in reading order, so grouping on (block, line) rebuilds lines
+    for _, line_words in groupby(words, key=lambda w: (w[5], w[6])):
+        line_words = list(line_words)
+        line_txt = " ".join(w[4].strip() for w in line_words if w[4].strip())
+        if not line_txt:
+            continue
+
+        # Union bbox of the line's words
+        x0 = min(w[0] for w in line_words)
+        y0 = min(w[1] for w in line_words)
+        x1 = max(w[2] for w in line_words)
+        y1 = max(w[3] for w in line_words)
+        bbox = (x0, y0, x1, y1)
+
+        # "words" carries no font size; calibrate the line's bbox height back
+        # to an approximate point size so the >16pt heading cutoff (and the
+        # font_size field sent to the frontend) keeps its original meaning
+        approx_size = (y1 - y0) / LINE_HEIGHT_PER_POINT
+
+        if is_heading(line_txt, approx_size):
+            logger.debug("  Found heading: '%s' at RAW %s", line_txt[:30], bbox)
+            results.append({
+                "page": page_idx + 1,
+                "type": "heading",
+                "text": line_txt.strip(),
+                "coords": {
+                    "x0": bbox[0],
+                    "y0": bbox[1],
+                    "x1": bbox[2],
+                    "y1": bbox[3]
+                },
+                "page_dimensions": {"width": page_w, "height": page_h},
+                "font_size": approx_size
+            })
+        else:
+            start_pos = len(bulk)
+            bulk += line_txt + " "
+            end_pos = len(bulk)
+            indices.append((start_pos, end_pos, bbox))
+
+    logger.debug("  Assembled %d spans on page %d.", len(indices), page_idx + 1)
+
+    if indices:
+
+        # SoA layout: parallel arrays of span offsets and bboxes so the
+        # per-sentence work below is vectorized NumPy instead of tuple loops
+        span_starts = np.array([s for s, _, _ in indices], dtype=np.int32)
+        span_ends = np.array([e for _, e, _ in indices], dtype=np.int32)
+        span_bboxes = np.array([b for _, _, b in indices], dtype=np.float32)
 
         # Tokenize to sentences and map bounding boxes
-        for sent in sent_tokenize(bulk):
-            sent_start = bulk.find(sent)
-            if sent_start == -1: 
-                continue
-            sent_end = sent_start + len(sent)
-            
-            # Get overlapping bboxes
-            overlap_bboxes = [b for s, e, b, block_b in indices 
-                            if not (e < sent_start or s > sent_end)]
-            
-            if not overlap_bboxes:
-                print(f"    Skipped sentence (no bbox): '{sent[:32]}' ...")
+        for sent_start, sent_end in sentence_spans(bulk):
+            sent = bulk[sent_start:sent_end]
+
+            # Spans are appended in reading order, so starts and ends are both
+            # sorted: two binary searches find the contiguous overlap range
+            lo = np.searchsorted(span_ends, sent_start, side='left')
+            hi = np.searchsorted(span_starts, sent_end, side='right')
+            overlap_bboxes = span_bboxes[lo:hi]
+
+            if len(overlap_bboxes) == 0:
+                logger.debug("  Skipped sentence (no bbox): '%s' ...", sent[:32])
                 continue
-            
+
             # CRITICAL FIX: Filter bboxes to only those spatially close to each other
             if len(overlap_bboxes) > 1:
                 original_count = len(overlap_bboxes)
                 overlap_bboxes = filter_spatially_close_bboxes(overlap_bboxes)
                 if len(overlap_bboxes) < original_count:
-                    print(f"    Filtered {original_count - len(overlap_bboxes)} distant bboxes")
-            
+                    logger.debug("  Filtered %d distant bboxes", original_count - len(overlap_bboxes))
+
             # Calculate combined bounding box
-            x0 = min(b[0] for b in overlap_bboxes)
-            y0 = min(b[1] for b in overlap_bboxes)
-            x1 = max(b[2] for b in overlap_bboxes)
-            y1 = max(b[3] for b in overlap_bboxes)
-            
-            print(f"    Sentence: '{sent[:32]}' at RAW ({x0:.1f}, {y0:.1f}, {x1:.1f}, {y1:.1f}) [{len(overlap_bboxes)} bboxes]")
+            x0 = float(overlap_bboxes[:, 0].min())
+            y0 = float(overlap_bboxes[:, 1].min())
+            x1 = float(overlap_bboxes[:, 2].max())
+            y1 = float(overlap_bboxes[:, 3].max())
             
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("  Sentence: '%s' at RAW (%.1f, %.1f, %.1f, %.1f) [%d bboxes]",
+                             sent[:32], x0, y0, x1, y1, len(overlap_bboxes))
+
             results.append({
                 "page": page_idx + 1,
                 "type": "sentence",
@@ -150,52 +200,99 @@ def extract_pdf_regions(pdf_path):
                 "page_dimensions": {"width": page_w, "height": page_h}
             })
 
-    doc.close()
-    print(f"Extraction completed. Total regions: {len(results)}")
     return results
 
-def ocr_fallback_regions(pdf_path):
-    """Fallback OCR for image/scanned PDFs, returning RAW coordinates."""
-    print(f"Starting OCR fallback for {pdf_path}")
+def _process_page_batch(pdf_path, page_indices):
+    """Process a batch of pages with a worker-owned document handle."""
+    # MuPDF documents are not thread-safe, so each worker opens its own
     doc = fitz.open(pdf_path)
-    gathered = []
-    
-    for page_idx in range(len(doc)):
+    try:
+        return [_process_page(doc[page_idx], page_idx) for page_idx in page_indices]
+    finally:
+        doc.close()
+
+def extract_pdf_regions(doc):
+    """Extract all headings and sentences with RAW PyMuPDF bounding boxes.
+
+    Takes an already-open fitz.Document; workers still open their own
+    handles (by path) since MuPDF documents are not thread-safe.
+    """
+    pdf_path = doc.name
+    num_pages = len(doc)
+    logger.info("Total pages found: %d", num_pages)
+
+    if num_pages == 0:
+        return []
+
+    # Pages are independent; interleave them across workers so clusters of
+    # dense pages don't all land in the same batch
+    workers = min(os.cpu_count() or 1, num_pages)
+    batches = [range(w, num_pages, workers) for w in range(workers)]
+
+    per_page = [None] * num_pages
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        batch_results = executor.map(
+            _process_page_batch, [pdf_path] * workers, batches
+        )
+        for batch, page_results in zip(batches, batch_results):
+            for page_idx, regions in zip(batch, page_results):
+                per_page[page_idx] = regions
+
+    # Flatten back to page order
+    results = [region for regions in per_page for region in regions]
+    logger.info("Extraction completed. Total regions: %d", len(results))
+    return results
+
+# Fixed OCR rasterization resolution: enough for Tesseract accuracy without
+# rendering oversized pixmaps
+OCR_DPI = 150
+
+def _ocr_page(pdf_path, page_idx):
+    """Rasterize and OCR a single page; runs in a worker process."""
+    doc = fitz.open(pdf_path)
+    try:
         page = doc[page_idx]
         page_w, page_h = page.rect.width, page.rect.height
-        pix = page.get_pixmap()
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        print(f"OCR on page {page_idx + 1} (image size: {pix.width}x{pix.height})")
-        
+        zoom = OCR_DPI / 72
+        # Grayscale render: Tesseract binarizes internally anyway, and one
+        # byte per pixel cuts pixmap memory and copy bandwidth 3x vs RGB
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY)
+        # Wrap the pixmap buffer as an ndarray directly, no PIL round-trip
+        img = np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.width)
+        logger.debug("OCR on page %d (image size: %dx%d)", page_idx + 1, pix.width, pix.height)
+
         ocr_data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
         N = len(ocr_data['level'])
-        print(f"  Detected {N} OCR regions.")
-        
+        logger.debug("  Detected %d OCR regions.", N)
+
+        gathered = []
         for i in range(N):
             txt = ocr_data['text'][i].strip()
             if not txt:
                 continue
-                
+
             # Get OCR coordinates (top-left origin)
             x, y, w, h = (
-                ocr_data['left'][i], 
-                ocr_data['top'][i], 
-                ocr_data['width'][i], 
+                ocr_data['left'][i],
+                ocr_data['top'][i],
+                ocr_data['width'][i],
                 ocr_data['height'][i]
             )
-            
+
             # Scale to PDF coordinate system
             sx = page_w / pix.width
             sy = page_h / pix.height
-            
+
             # Convert OCR (top-left) to PyMuPDF (bottom-left) coordinates
             pdf_x0 = x * sx
             pdf_y0 = page_h - (y + h) * sy  # Convert to bottom-left origin
             pdf_x1 = (x + w) * sx
             pdf_y1 = page_h - y * sy
-            
-            print(f"    OCR word: '{txt[:15]}' at RAW ({pdf_x0:.1f}, {pdf_y0:.1f}, {pdf_x1:.1f}, {pdf_y1:.1f})")
-            
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("  OCR word: '%s' at RAW (%.1f, %.1f, %.1f, %.1f)",
+                             txt[:15], pdf_x0, pdf_y0, pdf_x1, pdf_y1)
+
             gathered.append({
                 "page": page_idx + 1,
                 "type": "sentence",
@@ -209,25 +306,54 @@ def ocr_fallback_regions(pdf_path):
                 "page_dimensions": {"width": page_w, "height": page_h},
                 "font_size": None
             })
-    
-    doc.close()
-    print(f"OCR extraction finished. {len(gathered)} regions found.")
+
+        return gathered
+    finally:
+        doc.close()
+
+def ocr_fallback_regions(doc):
+    """Fallback OCR for image/scanned PDFs, returning RAW coordinates.
+
+    Takes an already-open fitz.Document; worker processes re-open by path.
+    """
+    pdf_path = doc.name
+    num_pages = len(doc)
+    logger.info("Starting OCR fallback for %s", pdf_path)
+
+    if num_pages == 0:
+        return []
+
+    # Tesseract is single-threaded per call and rasterization is CPU-bound,
+    # so pages parallelize across processes (no GIL contention)
+    workers = max(1, min((os.cpu_count() or 2) // 2, num_pages))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        page_results = executor.map(
+            _ocr_page, [pdf_path] * num_pages, range(num_pages)
+        )
+        gathered = [region for regions in page_results for region in regions]
+
+    logger.info("OCR extraction finished. %d regions found.", len(gathered))
     return gathered
 
 def extract_esg_pdf_sentences(pdf_path):
     """Main pipeline for extracting text with RAW coordinates for ESG analysis."""
-    print("=== ESG PDF Extraction Pipeline ===")
-    regions = extract_pdf_regions(pdf_path)
-    
-    if not regions:
-        print("No text regions found, using OCR fallback...")
-        regions = ocr_fallback_regions(pdf_path)
+    logger.info("=== ESG PDF Extraction Pipeline ===")
+    logger.info("Loading PDF: %s", pdf_path)
+
+    # Parse the xref/page tree once and share the handle with both paths
+    with fitz.open(pdf_path) as doc:
+        regions = extract_pdf_regions(doc)
+
         if not regions:
-            print("No regions found after OCR. Extraction failed.")
-            return None
+            logger.info("No text regions found, using OCR fallback...")
+            regions = ocr_fallback_regions(doc)
+
+    if not regions:
+        logger.warning("No regions found after OCR. Extraction failed.")
+        return None
     
-    print(f"Regions ready for downstream processing: {len(regions)} found.")
-    print("📍 All coordinates are RAW PyMuPDF format - frontend will transform them.")
+    logger.info("Regions ready for downstream processing: %d found.", len(regions))
+    logger.info("📍 All coordinates are RAW PyMuPDF format - frontend will transform them.")
     return regions
 
 # Legacy function for backward compatibility
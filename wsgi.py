@@ -0,0 +1,13 @@
+"""
+WSGI entry point for production deployment
+
+Run with gunicorn so the SentenceTransformer model is loaded once in the
+parent and shared with the workers via copy-on-write:
+
+    gunicorn --preload -w $(nproc) --threads 2 -b 0.0.0.0:8080 wsgi:app
+"""
+
+from app import app
+
+if __name__ == "__main__":
+    app.run()